@@ -1,23 +1,26 @@
+import json
 import logging
 import os
+import queue
 import time
+from functools import lru_cache
 from http import HTTPStatus
-from json.decoder import JSONDecodeError
+from logging.handlers import QueueHandler, QueueListener
 
+import orjson
 import requests
 import telegram
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from telegram import Bot, TelegramError
+from telegram.error import RetryAfter
+from urllib3.util.retry import Retry
 
 
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename='main.log',
-    format='%(asctime)s, %(levelname)s, %(message)s, %(name)s',
-    filemode='w'
-)
+LOG_FILE = 'main.log'
+LOG_FORMAT = '%(asctime)s, %(levelname)s, %(message)s, %(name)s'
 logger = logging.getLogger(__name__)
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
@@ -25,76 +28,180 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_TIME = 600
+# В режиме ONESHOT бот делает один опрос и завершается,
+# а периодический запуск берет на себя systemd-таймер.
+ONESHOT = os.getenv('ONESHOT') == '1'
+TIMESTAMP_FILE = os.path.expanduser('~/.cache/homework_bot/ts')
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
-LIST_OF_ERRORS = []
+TIMEOUT = (5, 30)
+NOT_MODIFIED = object()
+# ETag последнего ответа API; хранится только в памяти процесса,
+# поэтому в режиме ONESHOT условные запросы не используются.
+LAST_ETAG = None
+# Одинаковая ошибка повторно отправляется не чаще раза в час:
+# окно должно быть больше RETRY_TIME, иначе затяжной сбой
+# будет присылать сообщение на каждом опросе.
+ERROR_WINDOW = RETRY_TIME * 6
+ERROR_TTL = ERROR_WINDOW * 4
+LAST_SENT_ERRORS = {}
+
+# Одна сессия на всё время работы: соединение с API переиспользуется
+# между запросами и не устанавливается заново каждые RETRY_TIME секунд.
+# Заголовок Authorization добавляется в main() после проверки токенов.
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=1.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET'}),
+        respect_retry_after_header=True
+    )
+))
 
 HOMEWORK_STATUSES = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+STATUS_TEMPLATE = 'Изменился статус проверки работы "%s". %s'
+MESSAGE_LIMIT = 4096
+MESSAGE_SEPARATOR = '\n\n'
+SEND_ATTEMPTS = 3
+
+
+class RateLimiter:
+    """Ограничивает частоту отправки сообщений по схеме token bucket.
+    Не более capacity сообщений за period секунд,
+    при исчерпании лимита ждет появления свободного токена.
+    """
+
+    def __init__(self, capacity, period) -> None:
+        """Создает заполненное ведро на capacity токенов."""
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def acquire(self) -> None:
+        """Забирает токен, при необходимости дожидаясь его."""
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        if self.tokens < 1:
+            time.sleep((1 - self.tokens) / self.rate)
+            self.tokens = 1
+            self.updated = time.monotonic()
+        self.tokens -= 1
+
+
+# Лимиты Telegram: общий на бота и на сообщения в один чат.
+GLOBAL_LIMITER = RateLimiter(capacity=20, period=20)
+CHAT_LIMITER = RateLimiter(capacity=20, period=60)
+
+
+@lru_cache(maxsize=None)
+def get_bot() -> Bot:
+    """Возвращает единственный экземпляр бота.
+    Создается при первом обращении, чтобы пул соединений
+    с Telegram переиспользовался между отправками.
+    """
+    return Bot(token=TELEGRAM_TOKEN)
 
 
 def send_and_logging_error(message) -> None:
     """Отправляет сообщение c содержимым ошибки в Telegram чат.
-    если до этого сообщение не было отправлено.
+    если такое же сообщение не отправлялось последние ERROR_WINDOW секунд.
     """
     logger.error(message)
 
-    if message in LIST_OF_ERRORS:
+    now = time.monotonic()
+    sent = LAST_SENT_ERRORS.get(message)
+    if sent is not None and now - sent < ERROR_WINDOW:
         return
 
-    bot = Bot(token=TELEGRAM_TOKEN)
-    telegram_message = send_message(bot, message)
+    telegram_message = send_message(get_bot(), message)
     if isinstance(telegram_message, telegram.message.Message):
-        LIST_OF_ERRORS.append(message)
+        for old_message, old_sent in list(LAST_SENT_ERRORS.items()):
+            if now - old_sent > ERROR_TTL:
+                del LAST_SENT_ERRORS[old_message]
+        LAST_SENT_ERRORS[message] = now
 
 
 def send_message(bot, message) -> telegram.message.Message:
     """Отправляет сообщение в Telegram чат."""
-    telegram_message = bot.send_message(TELEGRAM_CHAT_ID, message)
-
-    try:
-        telegram_message = bot.send_message(TELEGRAM_CHAT_ID, message)
-        logger.info(f'Отправлено сообщение: {message}')
-        return telegram_message
-    except TelegramError:
-        send_and_logging_error(f'НЕ Отправлено сообщение: {message}')
+    for attempt in range(1, SEND_ATTEMPTS + 1):
+        GLOBAL_LIMITER.acquire()
+        CHAT_LIMITER.acquire()
+        try:
+            telegram_message = bot.send_message(TELEGRAM_CHAT_ID, message)
+            logger.info(f'Отправлено сообщение: {message}')
+            return telegram_message
+        except RetryAfter as error:
+            logger.warning(
+                f'Telegram просит подождать {error.retry_after} с'
+            )
+            if attempt < SEND_ATTEMPTS:
+                time.sleep(error.retry_after)
+        except TelegramError as error:
+            # Только логируем: отправка ошибки в тот же Telegram
+            # снова упадет и зациклится.
+            logger.error(f'НЕ Отправлено сообщение: {message}. {error}')
+            return None
+    logger.error(
+        f'НЕ Отправлено сообщение: {message}. '
+        f'Исчерпано попыток: {SEND_ATTEMPTS}'
+    )
+    return None
 
 
 def get_api_answer(current_timestamp) -> dict:
     """Делает запрос к API-сервису.
     В качестве параметра функция получает временную метку.
     В случае успешного запроса должна вернуть ответ API,
-    преобразовав его из формата JSON к типам данных Python
+    преобразовав его из формата JSON к типам данных Python.
+    Если с прошлого запроса ответ не изменился, возвращает NOT_MODIFIED
     """
+    global LAST_ETAG
     timestamp = current_timestamp or int(time.time())
     params = {'from_date': timestamp}
     # params = {'from_date': 1656333949}  # 27/06
+    headers = {'If-None-Match': LAST_ETAG} if LAST_ETAG else None
     try:
-        answer = requests.get(ENDPOINT, headers=HEADERS, params=params)
-    except requests.exceptions.HTTPError as error:
-        send_and_logging_error(f'Http Error: {error}')
-        return None
-    except requests.exceptions.ConnectionError as error:
-        send_and_logging_error(f'Error Connecting: {error}')
-        return None
-    except requests.exceptions.Timeout as error:
-        send_and_logging_error(f'Timeout Error: {error}')
-        return None
+        answer = SESSION.get(
+            ENDPOINT, params=params, headers=headers, timeout=TIMEOUT
+        )
     except requests.exceptions.RequestException as error:
-        send_and_logging_error(f'Error: {error}')
-        return None
+        # Повторные попытки уже сделал Retry в адаптере сессии.
+        raise ConnectionError(f'Ошибка запроса к API: {error}') from error
+
+    if answer.status_code == HTTPStatus.NOT_MODIFIED:
+        return NOT_MODIFIED
 
     if answer.status_code != HTTPStatus.OK:
-        send_and_logging_error(f'В ответ от API статус {answer.status_code}')
-        return None
+        raise ConnectionError(f'В ответ от API статус {answer.status_code}')
+
+    LAST_ETAG = answer.headers.get('ETag')
 
     try:
-        return answer.json()
-    except JSONDecodeError:
-        send_and_logging_error('Ошибка преобразования в джейсон')
+        return orjson.loads(answer.content)
+    except orjson.JSONDecodeError as error:
+        raise ValueError(
+            f'Ошибка преобразования в джейсон: {error}'
+        ) from error
+
+
+def reset_etag() -> None:
+    """Забывает ETag последнего ответа.
+    Нужно, когда ответ не удалось обработать: иначе API ответит 304
+    и недоставленные статусы больше не придут.
+    """
+    global LAST_ETAG
+    LAST_ETAG = None
 
 
 def check_response(response) -> list:
@@ -103,23 +210,17 @@ def check_response(response) -> list:
     то функция должна вернуть список домашних работ
     """
     if not isinstance(response, dict):
-        # send_and_logging_error('В ответ от API вернулся не словарь')
-        # это чтобы пройти pytest
         raise TypeError('В ответ от API вернулся не словарь')
 
     homeworks_list = response.get('homeworks')
     if homeworks_list is None:
-        send_and_logging_error('В ответе от API нет ключа homeworks')
-        return None
+        raise KeyError('В ответе от API нет ключа homeworks')
 
-    current_date = response.get('current_date')
-    if current_date is None:
-        send_and_logging_error('В ответе от API нет ключа current_date')
-        return None
+    if 'current_date' not in response:
+        raise KeyError('В ответе от API нет ключа current_date')
 
     if not isinstance(homeworks_list, list):
-        send_and_logging_error('homeworks_list не список')
-        return None
+        raise TypeError('homeworks_list не список')
 
     return homeworks_list
 
@@ -138,25 +239,83 @@ def parse_status(homework) -> str:
         raise KeyError('В словаре homework нет поля homework_name')
 
     homework_status = homework.get('status')
-    verdict = HOMEWORK_STATUSES.get(homework_status)
+    try:
+        verdict = HOMEWORK_STATUSES[homework_status]
+    except KeyError:
+        raise KeyError(
+            f'В ответе от API статус {homework_status}'
+        ) from None
+
+    return STATUS_TEMPLATE % (homework_name, verdict)
+
 
-    if verdict is None:
-        send_and_logging_error(f'В ответе от API статус {homework_status}')
+def build_statuses(homeworks_list) -> list:
+    """Готовит статусы всех работ из ответа API.
+    Работы, статус которых не удалось разобрать, пропускаются,
+    а ошибка отправляется в Telegram.
+    """
+    statuses = []
+    for homework in homeworks_list:
+        try:
+            statuses.append(parse_status(homework))
+        except KeyError as error:
+            send_and_logging_error(f'Не удалось разобрать работу: {error}')
+    return statuses
 
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+
+def build_messages(statuses) -> list:
+    """Склеивает статусы нескольких работ в сообщения для Telegram.
+    Каждое сообщение не длиннее MESSAGE_LIMIT символов.
+    """
+    messages = []
+    current = ''
+    for status in statuses:
+        candidate = (
+            f'{current}{MESSAGE_SEPARATOR}{status}' if current else status
+        )
+        if len(candidate) <= MESSAGE_LIMIT:
+            current = candidate
+            continue
+        if current:
+            messages.append(current)
+        while len(status) > MESSAGE_LIMIT:
+            messages.append(status[:MESSAGE_LIMIT])
+            status = status[MESSAGE_LIMIT:]
+        current = status
+    if current:
+        messages.append(current)
+    return messages
 
 
 def check_tokens() -> bool:
     """Проверяет доступность переменных окружения.
     которые необходимы для работы программы.
     """
-    if PRACTICUM_TOKEN is None:
-        return False
-    if TELEGRAM_TOKEN is None:
-        return False
-    if TELEGRAM_CHAT_ID is None:
-        return False
-    return True
+    return all((PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID))
+
+
+def load_timestamp() -> int:
+    """Читает временную метку, сохраненную предыдущим запуском.
+    Если ее нет, возвращает текущее время и сразу сохраняет его,
+    чтобы неудачный первый запуск не сдвинул начало опроса.
+    """
+    try:
+        with open(TIMESTAMP_FILE) as file:
+            return int(json.load(file))
+    except (OSError, TypeError, ValueError):
+        timestamp = int(time.time())
+        save_timestamp(timestamp)
+        return timestamp
+
+
+def save_timestamp(timestamp) -> None:
+    """Сохраняет временную метку для следующего запуска."""
+    try:
+        os.makedirs(os.path.dirname(TIMESTAMP_FILE), exist_ok=True)
+        with open(TIMESTAMP_FILE, 'w') as file:
+            json.dump(timestamp, file)
+    except OSError as error:
+        logger.error(f'Не удалось сохранить временную метку: {error}')
 
 
 def main():
@@ -165,30 +324,59 @@ def main():
         logger.critical('Не доступны переменные окружения!')
         return
 
-    bot = Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
+    SESSION.headers['Authorization'] = f'OAuth {PRACTICUM_TOKEN}'
+    bot = get_bot()
+    current_timestamp = load_timestamp() if ONESHOT else int(time.time())
 
     while True:
         try:
             response = get_api_answer(current_timestamp)
-            homeworks_list = check_response(response)
-            if homeworks_list is None:
-                return
-            if len(homeworks_list) > 0:
-                homework = homeworks_list[0]
-                current_timestamp = homework.get('current_date')
-                message = parse_status(homework)
-                send_message(bot, message)
-
-            time.sleep(RETRY_TIME)
+            if response is not NOT_MODIFIED:
+                homeworks_list = check_response(response)
+                statuses = build_statuses(homeworks_list)
+                # Метка сдвигается, только когда все статусы доставлены,
+                # иначе следующий опрос получит эти работы снова.
+                if all(
+                    send_message(bot, message)
+                    for message in build_messages(statuses)
+                ):
+                    current_timestamp = response.get(
+                        'current_date', current_timestamp
+                    )
+                else:
+                    reset_etag()
 
         except Exception as error:
+            reset_etag()
             message = f'Сбой в работе программы: {error}'
             send_and_logging_error(message)
-            time.sleep(RETRY_TIME)
         else:
-            send_and_logging_error('неопознанный косяк')
+            if ONESHOT:
+                save_timestamp(current_timestamp)
+
+        if ONESHOT:
+            return
+        time.sleep(RETRY_TIME)
+
+
+def setup_logging() -> QueueListener:
+    """Настраивает логирование через очередь.
+    Записи складываются в очередь, а в файл их пишет отдельный поток
+    QueueListener, который нужно запустить.
+    """
+    log_queue = queue.Queue(-1)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG)
+    root_logger.addHandler(QueueHandler(log_queue))
+    file_handler = logging.FileHandler(LOG_FILE, mode='a', encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return QueueListener(log_queue, file_handler)
 
 
 if __name__ == '__main__':
-    main()
+    log_listener = setup_logging()
+    log_listener.start()
+    try:
+        main()
+    finally:
+        log_listener.stop()
@@ -1,7 +1,10 @@
+import json
+import logging
 import os
+import time
 from http import HTTPStatus
+from logging.handlers import QueueHandler
 
-import requests
 import telegram
 import utils
 
@@ -18,18 +21,6 @@ class MockResponseGET:
             'Проверьте, что вы делаете запрос на правильный '
             'ресурс API для запроса статуса домашней работы'
         )
-        assert 'headers' in kwargs, (
-            'Проверьте, что вы передали заголовки `headers` для запроса '
-            'статуса домашней работы'
-        )
-        assert 'Authorization' in kwargs['headers'], (
-            'Проверьте, что в параметры `headers` для запроса статуса '
-            'домашней работы добавили Authorization'
-        )
-        assert kwargs['headers']['Authorization'].startswith('OAuth '), (
-            'Проверьте, что в параметрах `headers` для запроса статуса '
-            'домашней работы Authorization начинается с OAuth'
-        )
         assert params is not None, (
             'Проверьте, что передали параметры `params` для запроса '
             'статуса домашней работы'
@@ -44,6 +35,7 @@ class MockResponseGET:
         )
         self.random_timestamp = random_timestamp
         self.status_code = http_status
+        self.headers = {}
 
     def json(self):
         data = {
@@ -52,6 +44,10 @@ class MockResponseGET:
         }
         return data
 
+    @property
+    def content(self):
+        return json.dumps(self.json()).encode()
+
 
 class MockTelegramBot:
 
@@ -73,6 +69,73 @@ class MockTelegramBot:
         return self.random_timestamp
 
 
+class MockFailingTelegramBot:
+
+    def __init__(self):
+        self.calls = 0
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.calls += 1
+        raise telegram.TelegramError('Telegram недоступен')
+
+
+class MockRetryAfterTelegramBot:
+
+    def __init__(self):
+        self.calls = 0
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.calls += 1
+        raise telegram.error.RetryAfter(1)
+
+
+class MockRecordingTelegramBot:
+
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.messages.append(text)
+        return telegram.Message(
+            message_id=len(self.messages), date=None, chat=None, text=text
+        )
+
+
+class MockFlakyTelegramBot(MockRecordingTelegramBot):
+
+    def __init__(self, failures=1):
+        super().__init__()
+        self.failures = failures
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise telegram.error.NetworkError('Telegram недоступен')
+        return super().send_message(chat_id, text, **kwargs)
+
+
+class MockETagResponse:
+
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.headers = {'ETag': '"v1"'}
+        self.content = json.dumps(data).encode()
+
+
+class MockClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
 class TestHomework:
     HOMEWORK_STATUSES = {
         'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -102,6 +165,28 @@ class TestHomework:
         for v in ENV_VARS:
             os.environ[v] = ''
 
+    def prepare_main(self, monkeypatch, tmp_path):
+        """Настраивает бота на один цикл `main` без сети."""
+        import homework
+
+        bot = MockRecordingTelegramBot()
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', 12345)
+        monkeypatch.setattr(homework, 'ONESHOT', True)
+        monkeypatch.setattr(
+            homework, 'TIMESTAMP_FILE', str(tmp_path / 'ts')
+        )
+        monkeypatch.setattr(homework, 'get_bot', lambda: bot)
+        monkeypatch.setattr(homework, 'LAST_SENT_ERRORS', {})
+        monkeypatch.setattr(homework, 'GLOBAL_LIMITER', homework.RateLimiter(
+            capacity=20, period=20
+        ))
+        monkeypatch.setattr(homework, 'CHAT_LIMITER', homework.RateLimiter(
+            capacity=20, period=60
+        ))
+        return bot
+
     def test_check_tokens_false(self):
         for v in self.ENV_VARS:
             try:
@@ -169,6 +254,34 @@ class TestHomework:
             'Убедитесь, что настроили логирование для вашего бота'
         )
 
+    def test_setup_logging(self, monkeypatch, tmp_path):
+        import homework
+
+        root_logger = logging.getLogger()
+        assert not any(
+            isinstance(handler, QueueHandler)
+            for handler in root_logger.handlers
+        ), (
+            'Убедитесь, что обработчик очереди логов не устанавливается '
+            'при импорте модуля'
+        )
+
+        log_file = tmp_path / 'main.log'
+        monkeypatch.setattr(homework, 'LOG_FILE', str(log_file))
+        monkeypatch.setattr(root_logger, 'handlers', [])
+        monkeypatch.setattr(root_logger, 'level', root_logger.level)
+        listener = homework.setup_logging()
+        listener.start()
+        homework.logger.info('проверка логирования')
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        assert ', INFO, проверка логирования, homework' in (
+            log_file.read_text(encoding='utf-8')
+        ), (
+            'Убедитесь, что `setup_logging` записывает логи в файл'
+        )
+
     def test_send_message(self, monkeypatch, random_timestamp):
         def mock_telegram_bot(*args, **kwargs):
             return MockTelegramBot(*args, random_timestamp=random_timestamp, **kwargs)
@@ -178,6 +291,143 @@ class TestHomework:
         import homework
         utils.check_function(homework, 'send_message', 2)
 
+    def test_send_message_telegram_error(self):
+        import homework
+
+        bot = MockFailingTelegramBot()
+        started = time.monotonic()
+        result = homework.send_message(bot, 'сообщение')
+        assert time.monotonic() - started < 1, (
+            'Убедитесь, что `send_message` быстро завершается, '
+            'если Telegram недоступен'
+        )
+        assert result is None
+        assert bot.calls == 1, (
+            'Убедитесь, что `send_message` не пытается сообщить об ошибке '
+            'отправки через тот же Telegram'
+        )
+
+    def test_send_message_retry_after(self, monkeypatch):
+        import homework
+
+        clock = MockClock()
+        monkeypatch.setattr(time, 'monotonic', clock.monotonic)
+        monkeypatch.setattr(time, 'sleep', clock.sleep)
+        monkeypatch.setattr(homework, 'GLOBAL_LIMITER', homework.RateLimiter(
+            capacity=20, period=20
+        ))
+        monkeypatch.setattr(homework, 'CHAT_LIMITER', homework.RateLimiter(
+            capacity=20, period=60
+        ))
+        bot = MockRetryAfterTelegramBot()
+        result = homework.send_message(bot, 'сообщение')
+        assert result is None
+        assert bot.calls == homework.SEND_ATTEMPTS, (
+            'Убедитесь, что `send_message` ограничивает число повторных '
+            'попыток после RetryAfter'
+        )
+        assert clock.slept == [1] * (homework.SEND_ATTEMPTS - 1), (
+            'Убедитесь, что `send_message` не ждет после последней попытки'
+        )
+
+    def test_rate_limiter(self, monkeypatch):
+        import homework
+
+        clock = MockClock()
+        monkeypatch.setattr(time, 'monotonic', clock.monotonic)
+        monkeypatch.setattr(time, 'sleep', clock.sleep)
+
+        limiter = homework.RateLimiter(capacity=2, period=2)
+        limiter.acquire()
+        limiter.acquire()
+        assert clock.slept == [], (
+            'Убедитесь, что `RateLimiter` не ждет, пока в ведре есть токены'
+        )
+        limiter.acquire()
+        assert clock.slept == [1.0], (
+            'Убедитесь, что `RateLimiter` ждет появления токена, '
+            'когда ведро пусто'
+        )
+
+        clock.now += 10
+        limiter.acquire()
+        limiter.acquire()
+        assert clock.slept == [1.0], (
+            'Убедитесь, что `RateLimiter` пополняет ведро со временем'
+        )
+        limiter.acquire()
+        assert clock.slept == [1.0, 1.0], (
+            'Убедитесь, что ведро `RateLimiter` не переполняется '
+            'сверх capacity'
+        )
+
+    def test_send_and_logging_error_window(self, monkeypatch, tmp_path):
+        import homework
+
+        bot = self.prepare_main(monkeypatch, tmp_path)
+        clock = MockClock()
+        monkeypatch.setattr(time, 'monotonic', clock.monotonic)
+        monkeypatch.setattr(homework, 'GLOBAL_LIMITER', homework.RateLimiter(
+            capacity=20, period=20
+        ))
+        monkeypatch.setattr(homework, 'CHAT_LIMITER', homework.RateLimiter(
+            capacity=20, period=60
+        ))
+
+        clock.now = 100
+        homework.send_and_logging_error('ошибка')
+        clock.now += homework.ERROR_WINDOW - 1
+        homework.send_and_logging_error('ошибка')
+        assert bot.messages == ['ошибка'], (
+            'Убедитесь, что одинаковая ошибка отправляется не чаще '
+            'одного раза за ERROR_WINDOW секунд'
+        )
+
+        clock.now += 1
+        homework.send_and_logging_error('ошибка')
+        assert bot.messages == ['ошибка', 'ошибка'], (
+            'Убедитесь, что ошибка отправляется снова '
+            'после окончания ERROR_WINDOW'
+        )
+
+        clock.now += homework.ERROR_TTL + 1
+        homework.send_and_logging_error('другая ошибка')
+        assert list(homework.LAST_SENT_ERRORS) == ['другая ошибка'], (
+            'Убедитесь, что записи старше ERROR_TTL удаляются'
+        )
+
+    def test_main_repeated_error_across_cycles(self, monkeypatch,
+                                               tmp_path):
+        import homework
+
+        bot = self.prepare_main(monkeypatch, tmp_path)
+        clock = MockClock()
+        monkeypatch.setattr(time, 'monotonic', clock.monotonic)
+        monkeypatch.setattr(homework, 'GLOBAL_LIMITER', homework.RateLimiter(
+            capacity=20, period=20
+        ))
+        monkeypatch.setattr(homework, 'CHAT_LIMITER', homework.RateLimiter(
+            capacity=20, period=60
+        ))
+
+        def mock_get_api_answer(current_timestamp):
+            raise ConnectionError('API недоступен')
+
+        monkeypatch.setattr(homework, 'get_api_answer', mock_get_api_answer)
+        cycles = homework.ERROR_WINDOW // homework.RETRY_TIME
+        for _ in range(cycles):
+            homework.main()
+            clock.now += homework.RETRY_TIME
+        assert len(bot.messages) == 1, (
+            'Убедитесь, что повторяющаяся на каждом опросе ошибка '
+            'отправляется в Telegram один раз за ERROR_WINDOW'
+        )
+        homework.main()
+        assert len(bot.messages) == 2, (
+            'Убедитесь, что ошибка отправляется снова '
+            'после окончания ERROR_WINDOW'
+        )
+
     def test_get_api_answers(self, monkeypatch, random_timestamp,
                              current_timestamp, api_url):
         def mock_response_get(*args, **kwargs):
@@ -186,10 +436,10 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
 
+        monkeypatch.setattr(homework.SESSION, 'get', mock_response_get)
+
         func_name = 'get_api_answer'
         utils.check_function(homework, func_name, 1)
 
@@ -232,10 +482,10 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_500_response_get)
-
         import homework
 
+        monkeypatch.setattr(homework.SESSION, 'get', mock_500_response_get)
+
         func_name = 'get_api_answer'
         try:
             homework.get_api_answer(current_timestamp)
@@ -247,6 +497,284 @@ class TestHomework:
                 'когда API возвращает код, отличный от 200'
             )
 
+    def test_get_api_answer_not_modified(self, monkeypatch, random_timestamp,
+                                         current_timestamp, api_url):
+        sent_headers = []
+
+        def mock_etag_response_get(*args, headers=None, **kwargs):
+            sent_headers.append(headers)
+            http_status = HTTPStatus.NOT_MODIFIED if headers else HTTPStatus.OK
+            response = MockResponseGET(
+                *args, random_timestamp=random_timestamp,
+                current_timestamp=current_timestamp,
+                http_status=http_status, **kwargs
+            )
+            response.headers = {'ETag': '"etag"'}
+            return response
+
+        import homework
+
+        monkeypatch.setattr(homework.SESSION, 'get', mock_etag_response_get)
+        monkeypatch.setattr(homework, 'LAST_ETAG', None)
+
+        func_name = 'get_api_answer'
+        result = homework.get_api_answer(current_timestamp)
+        assert isinstance(result, dict)
+        result = homework.get_api_answer(current_timestamp)
+        assert sent_headers[1] == {'If-None-Match': '"etag"'}, (
+            f'Убедитесь, что функция `{func_name}` передает ETag '
+            'прошлого ответа в заголовке If-None-Match'
+        )
+        assert result is homework.NOT_MODIFIED, (
+            f'Убедитесь, что функция `{func_name}` возвращает NOT_MODIFIED, '
+            'когда API отвечает 304'
+        )
+
+    def test_main_not_modified(self, monkeypatch, tmp_path):
+        import homework
+
+        bot = self.prepare_main(monkeypatch, tmp_path)
+
+        def mock_check_response(response):
+            assert False, (
+                'Убедитесь, что `main` не проверяет ответ API, '
+                'если он не изменился'
+            )
+
+        monkeypatch.setattr(
+            homework, 'get_api_answer', lambda ts: homework.NOT_MODIFIED
+        )
+        monkeypatch.setattr(homework, 'check_response', mock_check_response)
+        homework.main()
+        assert bot.messages == []
+
+    def test_get_api_answer_invalid_json(self, monkeypatch, random_timestamp,
+                                         current_timestamp, api_url):
+        class MockInvalidJSONResponseGET(MockResponseGET):
+            content = b'not json'
+
+        def mock_invalid_json_response_get(*args, **kwargs):
+            return MockInvalidJSONResponseGET(
+                *args, random_timestamp=random_timestamp,
+                current_timestamp=current_timestamp, **kwargs
+            )
+
+        import homework
+
+        monkeypatch.setattr(
+            homework.SESSION, 'get', mock_invalid_json_response_get
+        )
+
+        func_name = 'get_api_answer'
+        try:
+            homework.get_api_answer(current_timestamp)
+        except ValueError:
+            pass
+        else:
+            assert False, (
+                f'Убедитесь, что функция `{func_name}` выбрасывает ошибку, '
+                'если ответ API не удалось преобразовать из JSON'
+            )
+
+    def test_timestamp_round_trip(self, monkeypatch, tmp_path,
+                                  random_timestamp):
+        import homework
+
+        monkeypatch.setattr(
+            homework, 'TIMESTAMP_FILE', str(tmp_path / 'cache' / 'ts')
+        )
+        homework.save_timestamp(random_timestamp)
+        assert homework.load_timestamp() == random_timestamp, (
+            'Убедитесь, что `load_timestamp` возвращает метку, '
+            'сохраненную `save_timestamp`'
+        )
+
+    def test_load_timestamp_fallback(self, monkeypatch, tmp_path):
+        import homework
+
+        timestamp_file = tmp_path / 'ts'
+        monkeypatch.setattr(homework, 'TIMESTAMP_FILE', str(timestamp_file))
+        monkeypatch.setattr(time, 'time', lambda: 1000)
+        assert homework.load_timestamp() == 1000, (
+            'Убедитесь, что `load_timestamp` возвращает текущее время, '
+            'если файла с меткой нет'
+        )
+        assert json.loads(timestamp_file.read_text()) == 1000, (
+            'Убедитесь, что `load_timestamp` сохраняет текущее время, '
+            'если файла с меткой нет'
+        )
+        timestamp_file.write_text('not json')
+        assert homework.load_timestamp() == 1000, (
+            'Убедитесь, что `load_timestamp` возвращает текущее время, '
+            'если файл с меткой поврежден'
+        )
+
+    def test_save_timestamp_os_error(self, monkeypatch, tmp_path, caplog):
+        import homework
+
+        not_a_dir = tmp_path / 'file'
+        not_a_dir.write_text('')
+        monkeypatch.setattr(
+            homework, 'TIMESTAMP_FILE', str(not_a_dir / 'ts')
+        )
+        homework.save_timestamp(1000)
+        assert 'Не удалось сохранить временную метку' in caplog.text, (
+            'Убедитесь, что `save_timestamp` логирует ошибку записи файла'
+        )
+
+    def test_main_oneshot(self, monkeypatch, tmp_path, random_timestamp):
+        import homework
+
+        self.prepare_main(monkeypatch, tmp_path)
+        calls = []
+
+        def mock_get_api_answer(current_timestamp):
+            calls.append(current_timestamp)
+            return {'homeworks': [], 'current_date': random_timestamp}
+
+        def mock_sleep(seconds):
+            assert False, (
+                'Убедитесь, что в режиме ONESHOT `main` не ждет '
+                'следующего опроса'
+            )
+
+        monkeypatch.setattr(homework, 'get_api_answer', mock_get_api_answer)
+        monkeypatch.setattr(time, 'sleep', mock_sleep)
+        homework.main()
+        assert len(calls) == 1, (
+            'Убедитесь, что в режиме ONESHOT `main` делает один опрос'
+        )
+        assert homework.load_timestamp() == random_timestamp, (
+            'Убедитесь, что в режиме ONESHOT `main` сохраняет метку '
+            'для следующего запуска'
+        )
+
+    def test_main_several_homeworks(self, monkeypatch, tmp_path,
+                                    random_timestamp):
+        import homework
+
+        bot = self.prepare_main(monkeypatch, tmp_path)
+        response = {
+            'homeworks': [
+                {'homework_name': 'hw1', 'status': 'approved'},
+                {'homework_name': 'hw2', 'status': 'unknown'},
+                {'homework_name': 'hw3', 'status': 'rejected'},
+            ],
+            'current_date': random_timestamp
+        }
+        monkeypatch.setattr(homework, 'get_api_answer', lambda ts: response)
+        homework.main()
+
+        statuses = [
+            message for message in bot.messages
+            if message.startswith('Изменился статус')
+        ]
+        assert statuses == [
+            'Изменился статус проверки работы "hw1". '
+            f'{self.HOMEWORK_STATUSES["approved"]}\n\n'
+            'Изменился статус проверки работы "hw3". '
+            f'{self.HOMEWORK_STATUSES["rejected"]}'
+        ], (
+            'Убедитесь, что `main` отправляет статусы всех работ '
+            'одним сообщением'
+        )
+        assert any('unknown' in message for message in bot.messages), (
+            'Убедитесь, что `main` сообщает о работе '
+            'с недокументированным статусом'
+        )
+        assert homework.load_timestamp() == random_timestamp, (
+            'Убедитесь, что `main` сдвигает метку времени '
+            'после отправки статусов'
+        )
+
+    def test_main_keeps_cursor_on_send_error(self, monkeypatch, tmp_path,
+                                             random_timestamp):
+        import homework
+
+        self.prepare_main(monkeypatch, tmp_path)
+        monkeypatch.setattr(
+            homework, 'get_bot', lambda: MockFailingTelegramBot()
+        )
+        response = {
+            'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+            'current_date': random_timestamp
+        }
+        monkeypatch.setattr(homework, 'get_api_answer', lambda ts: response)
+        homework.save_timestamp(1000)
+        homework.main()
+        assert homework.load_timestamp() == 1000, (
+            'Убедитесь, что `main` не сдвигает метку времени, '
+            'если статусы не удалось отправить'
+        )
+
+    def test_main_keeps_first_cursor_on_error(self, monkeypatch, tmp_path):
+        import homework
+
+        self.prepare_main(monkeypatch, tmp_path)
+
+        def mock_get_api_answer(current_timestamp):
+            raise ConnectionError('API недоступен')
+
+        monkeypatch.setattr(homework, 'get_api_answer', mock_get_api_answer)
+        monkeypatch.setattr(time, 'time', lambda: 1000)
+        homework.main()
+        monkeypatch.setattr(time, 'time', lambda: 2000)
+        assert homework.load_timestamp() == 1000, (
+            'Убедитесь, что после неудачного первого запуска следующий '
+            'опрос начинается с той же метки времени'
+        )
+
+    def test_main_sets_authorization(self, monkeypatch, tmp_path,
+                                     random_timestamp):
+        import homework
+
+        self.prepare_main(monkeypatch, tmp_path)
+        monkeypatch.setattr(homework.SESSION, 'headers', {})
+        monkeypatch.setattr(
+            homework, 'get_api_answer',
+            lambda ts: {'homeworks': [], 'current_date': random_timestamp}
+        )
+        homework.main()
+        assert homework.SESSION.headers.get('Authorization') == (
+            f'OAuth {homework.PRACTICUM_TOKEN}'
+        ), (
+            'Проверьте, что после проверки токенов `main` добавляет '
+            'в заголовки сессии Authorization с OAuth-токеном'
+        )
+
+    def test_main_retries_after_failed_send_with_etag(self, monkeypatch,
+                                                     tmp_path,
+                                                     random_timestamp):
+        import homework
+
+        self.prepare_main(monkeypatch, tmp_path)
+        bot = MockFlakyTelegramBot()
+        monkeypatch.setattr(homework, 'get_bot', lambda: bot)
+        monkeypatch.setattr(homework, 'LAST_ETAG', None)
+
+        def mock_etag_response_get(*args, headers=None, **kwargs):
+            if headers and headers.get('If-None-Match') == '"v1"':
+                return MockETagResponse(HTTPStatus.NOT_MODIFIED)
+            return MockETagResponse(HTTPStatus.OK, {
+                'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+                'current_date': random_timestamp
+            })
+
+        monkeypatch.setattr(homework.SESSION, 'get', mock_etag_response_get)
+        homework.save_timestamp(1000)
+        homework.main()
+        assert bot.messages == []
+        homework.main()
+        assert bot.messages == [
+            'Изменился статус проверки работы "hw1". '
+            f'{self.HOMEWORK_STATUSES["approved"]}'
+        ], (
+            'Убедитесь, что статус, который не удалось отправить, '
+            'отправляется на следующем опросе, даже если API '
+            'поддерживает ETag'
+        )
+        assert homework.load_timestamp() == random_timestamp
+
     def test_parse_status(self, random_timestamp):
         test_data = {
             "id": 123,
@@ -315,10 +843,10 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
 
+        monkeypatch.setattr(homework.SESSION, 'get', mock_response_get)
+
         func_name = 'check_response'
         response = homework.get_api_answer(current_timestamp)
         status = homework.check_response(response)
@@ -352,10 +880,10 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
 
+        monkeypatch.setattr(homework.SESSION, 'get', mock_response_get)
+
         func_name = 'parse_status'
         response = homework.get_api_answer(current_timestamp)
         homeworks = homework.check_response(response)
@@ -400,10 +928,10 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
 
+        monkeypatch.setattr(homework.SESSION, 'get', mock_response_get)
+
         func_name = 'parse_status'
         response = homework.get_api_answer(current_timestamp)
         homeworks = homework.check_response(response)
@@ -448,10 +976,10 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
 
+        monkeypatch.setattr(homework.SESSION, 'get', mock_response_get)
+
         func_name = 'parse_status'
         response = homework.get_api_answer(current_timestamp)
         homeworks = homework.check_response(response)
@@ -484,10 +1012,12 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_no_homeworks_response_get)
-
         import homework
 
+        monkeypatch.setattr(
+            homework.SESSION, 'get', mock_no_homeworks_response_get
+        )
+
         func_name = 'check_response'
         result = homework.get_api_answer(current_timestamp)
         try:
@@ -525,10 +1055,10 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
 
+        monkeypatch.setattr(homework.SESSION, 'get', mock_response_get)
+
         func_name = 'check_response'
         response = homework.get_api_answer(current_timestamp)
         try:
@@ -565,10 +1095,10 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
 
+        monkeypatch.setattr(homework.SESSION, 'get', mock_response_get)
+
         func_name = 'check_response'
         response = homework.get_api_answer(current_timestamp)
         try:
@@ -599,10 +1129,10 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_empty_response_get)
-
         import homework
 
+        monkeypatch.setattr(homework.SESSION, 'get', mock_empty_response_get)
+
         func_name = 'check_response'
         result = homework.get_api_answer(current_timestamp)
         try:
@@ -626,10 +1156,10 @@ class TestHomework:
             )
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
 
+        monkeypatch.setattr(homework.SESSION, 'get', mock_response_get)
+
         func_name = 'check_response'
         try:
             homework.get_api_answer(current_timestamp)
@@ -640,3 +1170,24 @@ class TestHomework:
                 f'Убедитесь, что в функции `{func_name}` обрабатываете ситуацию, '
                 'когда API возвращает код, отличный от 200'
             )
+
+    def test_build_messages(self):
+        import homework
+
+        func_name = 'build_messages'
+        utils.check_function(homework, func_name, 1)
+
+        statuses = ['a' * 3000, 'b' * 1000, 'c' * 5000]
+        messages = homework.build_messages(statuses)
+        assert all(len(message) <= 4096 for message in messages), (
+            f'Убедитесь, что функция `{func_name}` не возвращает сообщения '
+            'длиннее 4096 символов'
+        )
+        assert messages[0] == 'a' * 3000 + '\n\n' + 'b' * 1000, (
+            f'Убедитесь, что функция `{func_name}` объединяет статусы '
+            'в одно сообщение'
+        )
+        assert ''.join(messages[1:]) == 'c' * 5000, (
+            f'Убедитесь, что функция `{func_name}` разбивает длинный статус '
+            'на несколько сообщений'
+        )